@@ -1,269 +1,191 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import csv
+import gzip
 import html
+import io
+import mmap
 import re
+import string
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
 
 
-ROOT = Path(__file__).resolve().parent
+ROOT = Path(__file__).parent
 INPUT_FILE = ROOT / "review_responses.tsv"
 OUTPUT_DIR = ROOT / "docs"
 OUTPUT_FILE_DOCS = OUTPUT_DIR / "index.html"
 OUTPUT_FILE_ROOT = ROOT / "index.html"
+TEMPLATE_FILE = ROOT / "templates" / "layout.html"
+
+
+def iter_rows(path: Path) -> Iterator[tuple[str, str]]:
+    with path.open("rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with mm:
+            mm.readline()  # header
+            for line in iter(mm.readline, b""):
+                parts = line.split(b"\t", 2)
+                if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+                    continue
+                opinion = parts[0].decode("utf-8").strip()
+                response = parts[1].decode("utf-8").strip()
+                if opinion and response:
+                    yield (opinion, response)
+
+
+_NEEDS_MARKUP = re.compile(r"[&<>\"'\n]")
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+    "\n": "<br>",
+})
+
+
+@lru_cache(maxsize=2048)
+def linebreak_to_html(text: str, _search=_NEEDS_MARKUP.search) -> str:
+    if not _search(text):
+        return text
+    return text.translate(_ESCAPE_TABLE)
+
+
+_PAGE_MARKER = "頁碼："
+_MARKER_LEN = len(_PAGE_MARKER)
+_DEFAULT_PAGE = sys.intern("第＿＿＿頁至第＿＿＿頁")
 
 
-def parse_rows(path: Path) -> list[tuple[str, str]]:
-    rows: list[tuple[str, str]] = []
-    with path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f, delimiter="\t")
-        header_seen = False
-        for row in reader:
-            if not row:
-                continue
-            if not header_seen:
-                header_seen = True
-                continue
-            if len(row) < 2:
-                continue
-            opinion = row[0].strip()
-            response = row[1].strip()
-            if opinion and response:
-                rows.append((opinion, response))
-    return rows
-
-
-def linebreak_to_html(text: str) -> str:
-    escaped = html.escape(text)
-    return escaped.replace("\n", "<br>")
+def split_response_and_page(response: str) -> tuple[str, str]:
+    idx = response.find(_PAGE_MARKER)
+    if idx < 0:
+        return response.strip(), _DEFAULT_PAGE
+    body = response[:idx].strip().rstrip("。")
+    page = response[idx + _MARKER_LEN:].strip()
+    return body, page or _DEFAULT_PAGE
 
 
-def split_response_and_page(response: str) -> tuple[str, str]:
-    marker = "頁碼："
-    if marker not in response:
-        return response.strip(), "第＿＿＿頁至第＿＿＿頁"
-    body, page = response.split(marker, 1)
-    return body.strip().rstrip("。"), page.strip()
+_NUMBERED_SPLIT = re.compile(r"(?:(?<=^)|(?<=。))\s*(?=\d+\.\s*)")
 
 
-def split_numbered_points(text: str) -> list[str]:
-    parts = re.split(r"(?:(?<=^)|(?<=。))\s*(?=\d+\.\s*)", text)
+@lru_cache(maxsize=2048)
+def split_numbered_points(text: str, _split=_NUMBERED_SPLIT.split) -> tuple[str, ...]:
+    parts = _split(text)
     points: list[str] = []
     for p in parts:
         p = p.strip().lstrip("。").strip()
         if not p:
             continue
         points.append(p)
-    return points if points else [text.strip()]
+    return tuple(points) if points else (text.strip(),)
 
 
+_POINT_OPEN = '<div class="point-item">'
+_POINT_SEP = '</div><div class="point-item">'
+
+
+@lru_cache(maxsize=2048)
 def render_points_html(text: str) -> str:
     items = split_numbered_points(text)
-    rows = []
-    for item in items:
-        rows.append(f"<div class=\"point-item\">{linebreak_to_html(item)}</div>")
-    return "".join(rows)
-
-
-def build_html(rows: list[tuple[str, str]], canonical_url: str) -> str:
-    table_rows = []
-    for opinion, response in rows:
-        response_body, page_text = split_response_and_page(response)
-        opinion_html = linebreak_to_html(opinion)
-        response_points_html = render_points_html(response_body)
-        page_html = linebreak_to_html(page_text)
-        table_rows.append(
-            "      <tr>\n"
-            f"        <td><ul class=\"cell-list\"><li>{opinion_html}</li></ul></td>\n"
-            "        <td>\n"
-            f"          <p class=\"diff diff-red\"><strong>【建議修改】</strong>{opinion_html}</p>\n"
-            f"          <div class=\"diff diff-blue\"><strong>【修正內容】</strong><div class=\"point-lines\">{response_points_html}</div></div>\n"
-            "        </td>\n"
-            f"        <td><ul class=\"cell-list\"><li>{page_html}</li></ul></td>\n"
-            "      </tr>"
-        )
-
-    return f"""<!doctype html>
-<html lang="zh-Hant">
-<head>
-  <meta charset="utf-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1">
-  <meta http-equiv="Content-Security-Policy" content="default-src 'none'; style-src 'unsafe-inline'; img-src 'self' data:; font-src 'self'; base-uri 'none'; form-action 'none'; frame-ancestors 'none'; upgrade-insecure-requests">
-  <meta name="referrer" content="no-referrer">
-  <meta name="robots" content="index,follow,max-image-preview:none">
-  <meta name="description" content="114年度碳中和中程計畫審查意見修正對照表，提供教育局報送使用。">
-  <meta name="color-scheme" content="light">
-  <link rel="canonical" href="{html.escape(canonical_url)}">
-  <title>114年度碳中和中程計畫 審查意見修正對照表</title>
-  <style>
-    :root {{
-      --bg: #f4f7f2;
-      --card: #ffffff;
-      --line: #d7dfd4;
-      --head: #2a4f35;
-      --headText: #f7fbf8;
-      --text: #1f2a22;
-      --muted: #5d6e62;
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
-      margin: 0;
-      font-family: "Noto Sans TC", "Microsoft JhengHei", sans-serif;
-      color: var(--text);
-      background:
-        radial-gradient(1000px 300px at 10% -20%, #dfeadb 0%, transparent 60%),
-        radial-gradient(700px 240px at 100% 0%, #e9efe4 0%, transparent 55%),
-        var(--bg);
-    }}
-    .wrap {{
-      max-width: 1180px;
-      margin: 32px auto;
-      padding: 0 16px 24px;
-    }}
-    .hero {{
-      background: linear-gradient(135deg, #2f5f41 0%, #244832 100%);
-      color: #fff;
-      border-radius: 14px;
-      padding: 22px 20px;
-      margin-bottom: 18px;
-      box-shadow: 0 8px 20px rgba(0, 0, 0, 0.12);
-    }}
-    .hero h1 {{
-      margin: 0 0 8px;
-      font-size: 1.28rem;
-      line-height: 1.4;
-    }}
-    .hero p {{
-      margin: 0;
-      color: #e4efe8;
-      font-size: .95rem;
-    }}
-    .card {{
-      background: var(--card);
-      border: 1px solid var(--line);
-      border-radius: 14px;
-      overflow: hidden;
-      box-shadow: 0 10px 24px rgba(10, 30, 10, .06);
-    }}
-    .scroll {{
-      overflow-x: auto;
-    }}
-    table {{
-      width: 100%;
-      border-collapse: collapse;
-      min-width: 980px;
-    }}
-    th, td {{
-      vertical-align: top;
-      border: 1px solid var(--line);
-      padding: 12px;
-      line-height: 1.6;
-      font-size: 0.95rem;
-    }}
-    th {{
-      background: var(--head);
-      color: var(--headText);
-      text-align: left;
-      position: sticky;
-      top: 0;
-      z-index: 1;
-    }}
-    td:first-child {{
-      width: 26%;
-      background: #f8fcf7;
-      font-weight: 700;
-    }}
-    td:nth-child(2) {{
-      width: 56%;
-    }}
-    td:nth-child(3) {{
-      width: 18%;
-      white-space: nowrap;
-    }}
-    .cell-list {{
-      margin: 0;
-      padding-left: 1.1rem;
-    }}
-    .cell-list li {{
-      margin: 0 0 .3rem 0;
-    }}
-    .cell-list li:last-child {{
-      margin-bottom: 0;
-    }}
-    .footer {{
-      margin-top: 14px;
-      color: var(--muted);
-      font-size: .86rem;
-    }}
-    .diff {{
-      margin: 0;
-    }}
-    .diff + .diff {{
-      margin-top: 8px;
-    }}
-    .point-lines {{
-      margin-top: .3rem;
-    }}
-    .point-item {{
-      margin: 0;
-    }}
-    .point-item + .point-item {{
-      margin-top: .4rem;
-    }}
-    .diff-red {{
-      color: #b42318;
-    }}
-    .diff-blue {{
-      color: #1849a9;
-    }}
-    @media (max-width: 768px) {{
-      .wrap {{ margin: 18px auto; }}
-      .hero h1 {{ font-size: 1.1rem; }}
-      th, td {{ padding: 10px; font-size: .9rem; }}
-    }}
-  </style>
-</head>
-<body>
-  <main class="wrap">
-    <section class="hero">
-      <h1>114年度「碳中和中程計畫」審查意見修正對照表</h1>
-      <p>三欄格式：審查意見 / 修正情形（紅藍對比）/ 頁碼（可直接列印或作為附件）</p>
-    </section>
-    <section class="card">
-      <div class="scroll">
-        <table>
-          <thead>
-            <tr>
-              <th>審查意見</th>
-              <th>修正情形（紅藍對比）</th>
-              <th>頁碼</th>
-            </tr>
-          </thead>
-          <tbody>
-{chr(10).join(table_rows)}
-          </tbody>
-        </table>
-      </div>
-    </section>
-    <p class="footer">此頁由 <code>build_site.py</code> 依 <code>review_responses.tsv</code> 自動產生。</p>
-  </main>
-</body>
-</html>
-"""
+    return _POINT_OPEN + _POINT_SEP.join(map(linebreak_to_html, items)) + "</div>"
+
+
+def _row_to_html(
+    row: tuple[str, str],
+    _split_page=split_response_and_page,
+    _to_html=linebreak_to_html,
+    _points=render_points_html,
+) -> str:
+    opinion, response = row
+    response_body, page_text = _split_page(response)
+    opinion_html = _to_html(opinion)
+    response_points_html = _points(response_body)
+    page_html = _to_html(page_text)
+    return (
+        "      <tr>\n"
+        f"        <td><p class=\"cell-text\">{opinion_html}</p></td>\n"
+        "        <td>\n"
+        f"          <p class=\"diff diff-red\"><strong>【建議修改】</strong>{opinion_html}</p>\n"
+        f"          <div class=\"diff diff-blue\"><strong>【修正內容】</strong><div class=\"point-lines\">{response_points_html}</div></div>\n"
+        "        </td>\n"
+        f"        <td><p class=\"cell-text\">{page_html}</p></td>\n"
+        "      </tr>"
+    )
+
+
+_STYLE_BLOCK = re.compile(r"(<style>)(.*?)(</style>)", re.S)
+
+
+def _minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def _load_template(path: Path) -> string.Template:
+    text = path.read_text(encoding="utf-8")
+    text = _STYLE_BLOCK.sub(lambda m: m[1] + _minify_css(m[2]) + m[3], text)
+    return string.Template(text)
+
+
+_TEMPLATE = _load_template(TEMPLATE_FILE)
+
+
+_PARALLEL_MIN_ROWS = 5000
+_PARALLEL_CHUNK = 1024
+
+
+def _render_chunk(rows: list[tuple[str, str]]) -> str:
+    return "\n".join(_row_to_html(row) for row in rows)
+
+
+def _iter_chunks(rows: Iterator[tuple[str, str]], size: int) -> Iterator[list[tuple[str, str]]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _render_body(rows: Iterable[tuple[str, str]]) -> str:
+    rows = iter(rows)
+    head = list(islice(rows, _PARALLEL_MIN_ROWS))
+    if len(head) < _PARALLEL_MIN_ROWS:
+        buf = io.StringIO()
+        write = buf.write
+        for row in head:
+            if buf.tell():
+                write("\n")
+            write(_row_to_html(row))
+        return buf.getvalue()
+    head_chunks = (head[i:i + _PARALLEL_CHUNK] for i in range(0, len(head), _PARALLEL_CHUNK))
+    with ProcessPoolExecutor() as pool:
+        return "\n".join(pool.map(_render_chunk, chain(head_chunks, _iter_chunks(rows, _PARALLEL_CHUNK))))
+
+
+def build_html(rows: Iterable[tuple[str, str]], canonical_url: str) -> str:
+    return _TEMPLATE.substitute(canonical=html.escape(canonical_url), body=_render_body(rows))
 
 
 def main() -> None:
-    rows = parse_rows(INPUT_FILE)
-    if not rows:
+    rows = iter_rows(INPUT_FILE)
+    first = next(rows, None)
+    if first is None:
         raise SystemExit("No rows found in review_responses.tsv")
+    rows = chain((first,), rows)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    html_root = build_html(rows, "https://haoahao.github.io/Carbon_Neutral/")
-    html_docs = build_html(rows, "https://haoahao.github.io/Carbon_Neutral/docs/")
-    OUTPUT_FILE_ROOT.write_text(html_root, encoding="utf-8")
-    OUTPUT_FILE_DOCS.write_text(html_docs, encoding="utf-8")
-    print(f"Generated: {OUTPUT_FILE_ROOT}")
-    print(f"Generated: {OUTPUT_FILE_DOCS}")
+    data = build_html(rows, "https://haoahao.github.io/Carbon_Neutral/").encode("utf-8")
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    for output in (OUTPUT_FILE_ROOT, OUTPUT_FILE_DOCS):
+        output.write_bytes(data)
+        output.with_name(output.name + ".gz").write_bytes(compressed)
+        print(f"Generated: {output}")
 
 
 if __name__ == "__main__":